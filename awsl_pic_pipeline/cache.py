@@ -0,0 +1,71 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+import orjson
+
+_logger = logging.getLogger(__name__)
+
+
+class UrlFileCache:
+    """Persistent cache of source URL -> uploaded Telegram files, backed by sqlite.
+
+    Lets later runs reuse file_ids of URLs that were already uploaded instead of
+    uploading them again. Entries older than ttl seconds are ignored.
+
+    The database is opened on first use. Methods block, so async callers run them
+    via asyncio.to_thread; a lock serializes access to the shared connection.
+    """
+
+    def __init__(self, path: str, ttl: float) -> None:
+        self._path: str = path
+        self._ttl: float = ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database and create the table on first use. Caller holds the lock."""
+        if self._conn is None:
+            # Calls come from arbitrary worker threads, serialized by self._lock
+            conn: sqlite3.Connection = sqlite3.connect(self._path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS url_files ("
+                "url_hash BLOB PRIMARY KEY, files BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(url: str) -> bytes:
+        return hashlib.blake2b(url.encode(), digest_size=16).digest()
+
+    def get_many(self, urls: Iterable[str]) -> dict[str, List[dict]]:
+        """Get cached file dicts (file_id, width, height) for the given URLs, skipping misses."""
+        keys: dict[bytes, str] = {self._key(url): url for url in urls}
+        if not keys:
+            return {}
+        placeholders: str = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT url_hash, files FROM url_files WHERE created_at >= ? AND url_hash IN ({placeholders})",
+                [time.time() - self._ttl, *keys],
+            ).fetchall()
+        return {keys[url_hash]: orjson.loads(files) for url_hash, files in rows}
+
+    def put_many(self, items: dict[str, List[dict]]) -> None:
+        """Store file dicts for the given URLs, replacing any previous entry."""
+        if not items:
+            return
+        now: float = time.time()
+        rows: List[tuple] = [(self._key(url), orjson.dumps(files), now) for url, files in items.items()]
+        with self._lock:
+            conn: sqlite3.Connection = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO url_files (url_hash, files, created_at) VALUES (?, ?, ?)", rows
+            )
+            conn.commit()
+        _logger.info("Cached uploaded files for %d URLs", len(items))
@@ -1,16 +1,22 @@
 import os
 from typing import Optional
 
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     db_url: str
     migration_limit: int = 50
+    migration_concurrency: int = Field(4, ge=1)
     awsl_storage_url: Optional[str] = None
     awsl_storage_api_token: Optional[str] = None
     awsl_storage_chat_id: Optional[str] = None
+    awsl_storage_prewarm: bool = True
+    awsl_storage_cache_path: Optional[str] = None
+    awsl_storage_cache_ttl: int = 30 * 24 * 3600
     enable_delete: bool = False
+    create_indexes: bool = False
 
     class Config:
         env_file = os.environ.get("ENV_FILE", ".env")
@@ -1,39 +1,73 @@
-import json
+import asyncio
 import logging
-import time
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-import httpx
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import orjson
+from sqlalchemy import Index, create_engine, exists, insert, select
+from sqlalchemy.orm import Session, sessionmaker
 
 from .config import settings
 from .models.models import Pic, AwslBlobV2, Mblog, AwslProducer
 from .models.pydantic_models import Blob, Blobs, BlobGroup, UploadGroup
-from .storage import upload_media_group, UploadResult
+from .storage import keep_warm, prewarm, upload_media_group, UploadResult
 
 _logger = logging.getLogger(__name__)
-_client: httpx.Client = httpx.Client(timeout=10)
-engine = create_engine(settings.db_url, pool_size=100)
+# Each of the MIGRATION_CONCURRENCY in-flight groups holds at most one connection
+# at a time from its worker thread; overflow covers bursts on top of that
+engine = create_engine(
+    settings.db_url,
+    pool_size=settings.migration_concurrency,
+    max_overflow=settings.migration_concurrency,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
 DBSession = sessionmaker(bind=engine)
 # Pic types in priority order (prioritize existing types first)
 PIC_TYPES: List[str] = ["original", "large", "mw2000", "largest", "largecover"]
-UPLOAD_DELAY: float = 3.0
+# Pic URL extensions that cannot be uploaded as photos
+SKIPPED_EXTENSIONS: tuple[str, ...] = (".gif",)
+# Pic has no AwslBlobV2 record yet; NOT EXISTS lets the planner use an anti-join
+NOT_UPLOADED = ~exists().where(AwslBlobV2.pic_id == Pic.pic_id)
 
 
-def delete_pic(blob_group: BlobGroup) -> None:
-    """Mark pic as deleted."""
+def ensure_indexes() -> None:
+    """Create missing indexes backing the NOT_UPLOADED anti-join and the awsl_id DESC top-N scan."""
+    for name, column in (
+        ("ix_awsl_blob_v2_pic_id", AwslBlobV2.pic_id),
+        ("ix_pic_awsl_id_desc", Pic.awsl_id.desc()),
+    ):
+        index: Index = Index(name, column)
+        try:
+            index.create(bind=engine, checkfirst=True)
+        finally:
+            # Index() attaches itself to the shared model table; detach it so the
+            # migration-only index never leaks into the models' metadata
+            index.table.indexes.discard(index)
+        _logger.info("Ensured index %s", index.name)
+
+
+def delete_pics(pic_ids: List[str], session: Optional[Session] = None) -> None:
+    """Mark pics as deleted with a single bulk UPDATE.
+
+    If a session is given, the update joins its transaction and is not committed here.
+    """
+    if not pic_ids:
+        return
     if not settings.enable_delete:
-        _logger.info("Delete disabled, skipping pic_id=%s", blob_group.id)
+        _logger.info("Delete disabled, skipping %d pics", len(pic_ids))
         return
-    session = DBSession()
+    own_session: bool = session is None
+    if own_session:
+        session = DBSession()
     try:
-        for picobj in session.query(Pic).filter(Pic.pic_id == blob_group.id).all():
-            picobj.deleted = True
-            picobj.cleaned = True
-        session.commit()
+        session.query(Pic).filter(Pic.pic_id.in_(pic_ids)).update(
+            {Pic.deleted: True, Pic.cleaned: True}, synchronize_session=False
+        )
+        if own_session:
+            session.commit()
     finally:
-        session.close()
+        if own_session:
+            session.close()
 
 
 def delete_upload_group(group: UploadGroup) -> None:
@@ -41,11 +75,41 @@ def delete_upload_group(group: UploadGroup) -> None:
     if not settings.enable_delete:
         _logger.info("Delete disabled, skipping awsl_id=%s", group.awsl_id)
         return
-    for blob_group in group.blob_groups:
-        delete_pic(blob_group)
+    delete_pics([blob_group.id for blob_group in group.blob_groups])
     _logger.info("Deleted all pics for awsl_id=%s", group.awsl_id)
 
 
+def _to_dimension(value: object) -> Optional[int]:
+    """Coerce a stored width/height to int, treating missing or malformed values as None."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _extract_first_valid(
+    pic_info: dict, filtered_stats: dict[str, int]
+) -> Optional[Tuple[str, str, Optional[int], Optional[int]]]:
+    """Return (pic_type, url, width, height) of the first usable pic type in PIC_TYPES order.
+
+    Counts each skipped URL in filtered_stats["invalid_url"]; returns None if no type is usable.
+    """
+    if not isinstance(pic_info, dict):
+        return None
+    for pic_type in PIC_TYPES:
+        pic_data = pic_info.get(pic_type)
+        if not isinstance(pic_data, dict):
+            continue
+        url: Optional[str] = pic_data.get("url")
+        if not url or url.rsplit("?", 1)[0].endswith(SKIPPED_EXTENSIONS):
+            filtered_stats["invalid_url"] += 1
+            continue
+        return pic_type, url, _to_dimension(pic_data.get("width")), _to_dimension(pic_data.get("height"))
+    return None
+
+
 def get_all_pic_to_upload() -> List[UploadGroup]:
     """Get pics grouped by awsl_id with caption."""
     session = DBSession()
@@ -53,30 +117,52 @@ def get_all_pic_to_upload() -> List[UploadGroup]:
         # First, get the top N awsl_id values to process
         # This ensures we limit by the number of groups, not total rows
         # Also join Mblog to ensure awsl_id has corresponding mblog record
-        awsl_ids_subquery = session.query(Pic.awsl_id).outerjoin(
-            AwslBlobV2, Pic.pic_id == AwslBlobV2.pic_id
-        ).join(
-            Mblog, Pic.awsl_id == Mblog.id
-        ).filter(
-            AwslBlobV2.pic_id.is_(None)
-        ).filter(
-            Pic.deleted.isnot(True)
-        ).group_by(Pic.awsl_id).order_by(Pic.awsl_id.desc()).limit(settings.migration_limit).subquery()
+        awsl_ids: List[str] = session.execute(
+            select(Pic.awsl_id).join(
+                Mblog, Pic.awsl_id == Mblog.id
+            ).where(
+                NOT_UPLOADED
+            ).where(
+                Pic.deleted.isnot(True)
+            ).group_by(Pic.awsl_id).order_by(Pic.awsl_id.desc()).limit(settings.migration_limit)
+        ).scalars().all()
+
+        # Build captions from mblog/producer metadata once per awsl_id,
+        # instead of pulling these columns along with every pic row
+        captions: dict[str, str] = {}
+        for meta in session.execute(
+            select(
+                Mblog.id, Mblog.uid, Mblog.mblogid, Mblog.re_user, AwslProducer.name,
+            ).outerjoin(
+                AwslProducer, Mblog.uid == AwslProducer.uid
+            ).where(Mblog.id.in_(awsl_ids))
+        ).mappings():
+            if meta["id"] in captions:
+                continue
+            wb_url: str = f"https://weibo.com/{meta['uid']}/{meta['mblogid']}"
+            screen_name: str = ""
+            if meta["re_user"]:
+                try:
+                    re_user: dict = orjson.loads(meta["re_user"])
+                    screen_name = re_user.get("screen_name", "")
+                except orjson.JSONDecodeError:
+                    pass
+            if not screen_name:
+                screen_name = meta["name"] or ""
+            captions[meta["id"]] = f"#{screen_name} {wb_url}" if screen_name else wb_url
 
         # Then get all pics belonging to those awsl_ids
-        pics = session.query(Pic, Mblog, AwslProducer).filter(
-            Pic.awsl_id.in_(session.query(awsl_ids_subquery.c.awsl_id))
-        ).outerjoin(
-            AwslBlobV2, Pic.pic_id == AwslBlobV2.pic_id
-        ).join(
-            Mblog, Pic.awsl_id == Mblog.id
-        ).outerjoin(
-            AwslProducer, Mblog.uid == AwslProducer.uid
-        ).filter(
-            AwslBlobV2.pic_id.is_(None)
-        ).filter(
+        # Select plain columns only, skipping ORM object hydration
+        stmt = select(
+            Pic.pic_id, Pic.awsl_id, Pic.pic_info,
+        ).where(
+            Pic.awsl_id.in_(awsl_ids)
+        ).where(
+            NOT_UPLOADED
+        ).where(
             Pic.deleted.isnot(True)
-        ).order_by(Pic.awsl_id.desc()).all()
+        ).order_by(Pic.awsl_id.desc())
+        rows = session.execute(stmt).mappings()
 
         awsl_groups: dict[str, UploadGroup] = {}
         filtered_stats: dict[str, int] = {
@@ -84,60 +170,49 @@ def get_all_pic_to_upload() -> List[UploadGroup]:
             "no_valid_type": 0,
             "invalid_url": 0,
         }
-        for pic, mblog, producer in pics:
+        invalid_pic_ids: List[str] = []
+        seen_pic_ids: set[str] = set()
+        for row in rows:
+            pic_id: str = row["pic_id"]
+            # Skip duplicate rows for a pic that has already been handled
+            if pic_id in seen_pic_ids:
+                continue
+            seen_pic_ids.add(pic_id)
+            awsl_id: str = row["awsl_id"]
             try:
-                pic_info: dict = json.loads(pic.pic_info) if pic.pic_info else {}
-            except json.JSONDecodeError:
+                pic_info: dict = orjson.loads(row["pic_info"]) if row["pic_info"] else {}
+            except orjson.JSONDecodeError:
                 filtered_stats["json_error"] += 1
-                delete_pic(BlobGroup(id=pic.pic_id, awsl_id=pic.awsl_id, blobs=Blobs(blobs={})))
+                invalid_pic_ids.append(pic_id)
                 continue
 
-            found_valid_pic = False
-            for pic_type in PIC_TYPES:
-                if pic_type not in pic_info or not isinstance(pic_info[pic_type], dict):
-                    continue
-                pic_data: dict = pic_info[pic_type]
-                url: Optional[str] = pic_data.get("url")
-                if not url or ".gif" in url:
-                    filtered_stats["invalid_url"] += 1
-                    continue
-
-                found_valid_pic = True
-                blob_group: BlobGroup = BlobGroup(
-                    id=pic.pic_id,
-                    awsl_id=pic.awsl_id,
-                    blobs=Blobs(blobs={
-                        pic_type: Blob(
-                            url=url,
-                            width=pic_data.get("width"),
-                            height=pic_data.get("height"),
-                        )
-                    })
-                )
-
-                if pic.awsl_id not in awsl_groups:
-                    wb_url: str = f"https://weibo.com/{mblog.uid}/{mblog.mblogid}" if mblog else ""
-                    screen_name: str = ""
-                    if mblog and mblog.re_user:
-                        try:
-                            re_user: dict = json.loads(mblog.re_user)
-                            screen_name = re_user.get("screen_name", "")
-                        except json.JSONDecodeError:
-                            pass
-                    if not screen_name and producer:
-                        screen_name = producer.name or ""
-                    awsl_groups[pic.awsl_id] = UploadGroup(
-                        awsl_id=pic.awsl_id,
-                        blob_groups=[],
-                        caption=f"#{screen_name} {wb_url}" if screen_name else wb_url,
-                    )
-                awsl_groups[pic.awsl_id].blob_groups.append(blob_group)
-                break
-
-            if not found_valid_pic:
+            first_valid: Optional[Tuple[str, str, Optional[int], Optional[int]]] = _extract_first_valid(
+                pic_info, filtered_stats
+            )
+            if first_valid is None:
                 filtered_stats["no_valid_type"] += 1
-                delete_pic(BlobGroup(id=pic.pic_id, awsl_id=pic.awsl_id, blobs=Blobs(blobs={})))
+                invalid_pic_ids.append(pic_id)
+                continue
 
+            pic_type, url, width, height = first_valid
+            # Fields come from our own DB, skip pydantic validation
+            blob_group: BlobGroup = BlobGroup.model_construct(
+                id=pic_id,
+                awsl_id=awsl_id,
+                blobs=Blobs.model_construct(blobs={
+                    pic_type: Blob.model_construct(url=url, width=width, height=height)
+                })
+            )
+
+            if awsl_id not in awsl_groups:
+                awsl_groups[awsl_id] = UploadGroup.model_construct(
+                    awsl_id=awsl_id,
+                    blob_groups=[],
+                    caption=captions.get(awsl_id, ""),
+                )
+            awsl_groups[awsl_id].blob_groups.append(blob_group)
+
+        delete_pics(invalid_pic_ids)
         res: List[UploadGroup] = list(awsl_groups.values())
         _logger.info("get_all_pic_to_upload: %d groups (filtered_pics: invalid_url=%d, no_type=%d, json_err=%d)",
                     len(res), filtered_stats["invalid_url"], filtered_stats["no_valid_type"], filtered_stats["json_error"])
@@ -146,36 +221,53 @@ def get_all_pic_to_upload() -> List[UploadGroup]:
     return res
 
 
-def save_telegram_files(blob_groups: List[BlobGroup]) -> None:
-    """Save uploaded file info to database."""
-    session = DBSession()
+def blob_group_record(blob_group: BlobGroup) -> dict:
+    """Build the AwslBlobV2 row for an uploaded blob group."""
+    return {
+        "awsl_id": blob_group.awsl_id,
+        "pic_id": blob_group.id,
+        # Serialize straight to JSON, no intermediate dict
+        "pic_info": blob_group.blobs.model_dump_json(),
+    }
+
+
+def save_telegram_files(records: List[dict], session: Optional[Session] = None) -> None:
+    """Save pre-built AwslBlobV2 rows to database in a single executemany INSERT.
+
+    If a session is given, the insert joins its transaction and is not committed here.
+    """
+    if not records:
+        return
+    own_session: bool = session is None
+    if own_session:
+        session = DBSession()
     try:
-        for blob_group in blob_groups:
-            record: AwslBlobV2 = AwslBlobV2(
-                awsl_id=blob_group.awsl_id,
-                pic_id=blob_group.id,
-                pic_info=blob_group.blobs.model_dump_json(),
-            )
-            session.add(record)
-            _logger.info("Saved: pic_id=%s", blob_group.id)
-        session.commit()
+        session.execute(insert(AwslBlobV2), records)
+        if own_session:
+            session.commit()
     finally:
-        session.close()
+        if own_session:
+            session.close()
+
 
+def save_upload_result(result: UploadResult) -> None:
+    """Save succeeded and delete failed pics of one group in a single transaction."""
+    records: List[dict] = [blob_group_record(blob_group) for blob_group in result.succeeded]
+    failed_ids: List[str] = [blob_group.id for blob_group in result.failed]
+    with DBSession.begin() as session:
+        save_telegram_files(records, session=session)
+        delete_pics(failed_ids, session=session)
 
-def upload_group_to_telegram(group: UploadGroup) -> bool:
+
+async def upload_group_to_telegram(group: UploadGroup) -> bool:
     """Upload a group of pics to Telegram, handling partial success."""
-    result: UploadResult = upload_media_group(group)
+    result: UploadResult = await upload_media_group(group)
 
-    # Save successfully uploaded pics
+    # Save successfully uploaded pics and delete failed pics
+    await asyncio.to_thread(save_upload_result, result)
     if result.succeeded:
-        save_telegram_files(result.succeeded)
         _logger.info("Saved %d succeeded pics for awsl_id=%s", len(result.succeeded), group.awsl_id)
-
-    # Delete failed pics
     if result.failed:
-        for blob_group in result.failed:
-            delete_pic(blob_group)
         _logger.warning("Deleted %d failed pics for awsl_id=%s", len(result.failed), group.awsl_id)
 
     # Return True if at least some pics succeeded
@@ -186,26 +278,47 @@ def upload_group_to_telegram(group: UploadGroup) -> bool:
         return False
 
 
-def migration() -> None:
+async def migration() -> None:
     """Main migration function."""
-    groups: List[UploadGroup] = get_all_pic_to_upload()
+    if settings.create_indexes:
+        await asyncio.to_thread(ensure_indexes)
+    groups: List[UploadGroup]
+    keep_warm_task: Optional[asyncio.Task] = None
+    if settings.awsl_storage_prewarm:
+        # Warm up the storage connection while the DB query runs
+        groups, _ = await asyncio.gather(asyncio.to_thread(get_all_pic_to_upload), prewarm())
+        keep_warm_task = asyncio.create_task(keep_warm())
+    else:
+        groups = await asyncio.to_thread(get_all_pic_to_upload)
+    try:
+        await _migrate_groups(groups)
+    finally:
+        if keep_warm_task is not None:
+            keep_warm_task.cancel()
+
+
+async def _migrate_groups(groups: List[UploadGroup]) -> None:
+    """Upload groups concurrently, bounded by migration_concurrency."""
     total_groups: int = len(groups)
-    success_count: int = 0
-    fail_count: int = 0
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(settings.migration_concurrency)
 
-    _logger.info("Starting migration: %d groups to process", total_groups)
+    _logger.info("Starting migration: %d groups to process (concurrency=%d)",
+                 total_groups, settings.migration_concurrency)
 
-    for idx, group in enumerate(groups, 1):
-        _logger.info("Processing group %d/%d (awsl_id=%s)", idx, total_groups, group.awsl_id)
-        try:
-            if upload_group_to_telegram(group):
-                success_count += 1
-            else:
-                fail_count += 1
-        except Exception as e:
-            _logger.exception("Error uploading group %d/%d (awsl_id=%s): %s", idx, total_groups, group.awsl_id, e)
-            delete_upload_group(group)
-            fail_count += 1
-        time.sleep(UPLOAD_DELAY)
+    async def process(idx: int, group: UploadGroup) -> bool:
+        async with semaphore:
+            _logger.info("Processing group %d/%d (awsl_id=%s)", idx, total_groups, group.awsl_id)
+            try:
+                return await upload_group_to_telegram(group)
+            except Exception as e:
+                _logger.exception("Error uploading group %d/%d (awsl_id=%s): %s", idx, total_groups, group.awsl_id, e)
+                await asyncio.to_thread(delete_upload_group, group)
+                return False
+
+    results: List[bool] = await asyncio.gather(
+        *(process(idx, group) for idx, group in enumerate(groups, 1))
+    )
+    success_count: int = sum(results)
+    fail_count: int = total_groups - success_count
 
     _logger.info("Migration completed: success=%d, fail=%d, total=%d", success_count, fail_count, total_groups)
@@ -1,17 +1,27 @@
-import json
+import asyncio
+import itertools
 import logging
+import random
 import re
 import time
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 import httpx
-from pydantic import BaseModel
+import orjson
+from pydantic import BaseModel, ValidationError
 
+from .cache import UrlFileCache
 from .config import settings
 from .models.pydantic_models import Blob, Blobs, BlobGroup, UploadGroup
 
 _logger = logging.getLogger(__name__)
-_client: httpx.Client = httpx.Client(timeout=60)
+# Uploads all target the same storage host, so keep connections alive and multiplex over HTTP/2
+_client: httpx.AsyncClient = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=60.0),
+    timeout=httpx.Timeout(60.0, connect=10.0),
+)
 
 
 class TelegramFile(BaseModel):
@@ -20,10 +30,87 @@ class TelegramFile(BaseModel):
     height: Optional[int] = None
 
 
+class _UploadResponse(BaseModel):
+    """Response body of /api/upload (single document)."""
+    success: bool = False
+    error: Optional[str] = None
+    files: List[TelegramFile] = []
+
+
+class _GroupUploadResponse(BaseModel):
+    """Response body of /api/upload/group, one list of photo sizes per uploaded URL."""
+    success: bool = False
+    error: Optional[str] = None
+    files: List[List[TelegramFile]] = []
+
+
 BATCH_SIZE: int = 6
 MAX_RETRIES: int = 10
-RETRY_DELAY: float = 5.0
-INDIVIDUAL_RETRY_DELAY: float = 3.0  # Delay between individual image retries
+# Exponential backoff with jitter: min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt) + U(0, BACKOFF_JITTER)
+BACKOFF_BASE: float = 0.5
+BACKOFF_CAP: float = 30.0
+BACKOFF_JITTER: float = 1.0
+PREWARM_INTERVAL: float = 30.0  # Seconds between keep-alive probes while migrating
+INDIVIDUAL_RETRY_CONCURRENCY: int = 3  # Max concurrent individual image retries per batch
+# Source URL -> uploaded files cache shared across runs, disabled unless a path is configured
+_url_cache: Optional[UrlFileCache] = (
+    UrlFileCache(settings.awsl_storage_cache_path, settings.awsl_storage_cache_ttl)
+    if settings.awsl_storage_cache_path else None
+)
+# Error marker for URLs Telegram cannot fetch, matched on the raw response body
+_WEBPAGE_MEDIA_EMPTY: bytes = b"WEBPAGE_MEDIA_EMPTY"
+# Matches "retry after N" where N is a number
+_RETRY_AFTER_RE: re.Pattern = re.compile(r'retry after\s+(\d+(?:\.\d+)?)', re.IGNORECASE)
+# Storage endpoints and headers derived from settings, computed once at import
+_STORAGE_BASE: str = settings.awsl_storage_url.rstrip('/') if settings.awsl_storage_url else ""
+_UPLOAD_URL: str = f"{_STORAGE_BASE}/api/upload"
+_UPLOAD_GROUP_URL: str = f"{_STORAGE_BASE}/api/upload/group"
+# Files are served at _FILE_URL_PREFIX + file_id
+_FILE_URL_PREFIX: str = f"{_STORAGE_BASE}/file/"
+_AUTH_HEADERS: dict[str, str] = {
+    "X-Api-Token": settings.awsl_storage_api_token or "",
+}
+_JSON_HEADERS: dict[str, str] = {
+    **_AUTH_HEADERS,
+    "Content-Type": "application/json",
+}
+# Monotonic time until which all uploads hold off after the storage API rate limited us
+_rate_limited_until: float = 0.0
+
+
+def _pause_uploads(delay: float) -> None:
+    """Hold off all concurrent uploads for delay seconds after a rate limit response."""
+    global _rate_limited_until
+    _rate_limited_until = max(_rate_limited_until, time.monotonic() + delay)
+
+
+async def _wait_for_rate_limit() -> None:
+    """Sleep until any shared rate limit pause has expired."""
+    delay: float = _rate_limited_until - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Capped exponential backoff delay for a retry attempt, jittered to desynchronize retries."""
+    return min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)) + random.uniform(0, BACKOFF_JITTER)
+
+
+async def prewarm() -> None:
+    """Open (or refresh) a pooled connection to the storage service with a HEAD probe."""
+    if not _STORAGE_BASE:
+        return
+    try:
+        await _client.head(_STORAGE_BASE)
+    except httpx.HTTPError as e:
+        _logger.warning("Storage prewarm probe failed: %s", e)
+
+
+async def keep_warm() -> None:
+    """Probe the storage service every PREWARM_INTERVAL seconds until cancelled."""
+    while True:
+        await asyncio.sleep(PREWARM_INTERVAL)
+        await prewarm()
 
 
 def _parse_retry_after(error_msg: str) -> Optional[float]:
@@ -40,8 +127,7 @@ def _parse_retry_after(error_msg: str) -> Optional[float]:
     if not error_msg:
         return None
 
-    # Pattern to match "retry after N" where N is a number
-    match = re.search(r'retry after\s+(\d+(?:\.\d+)?)', error_msg, re.IGNORECASE)
+    match = _RETRY_AFTER_RE.search(error_msg)
     if match:
         try:
             return float(match.group(1))
@@ -50,75 +136,79 @@ def _parse_retry_after(error_msg: str) -> Optional[float]:
     return None
 
 
-def build_telegram_url(file_id: str) -> str:
-    """Build the final URL for accessing a file via awsl-telegram-storage."""
-    if not settings.awsl_storage_url:
-        raise ValueError("awsl_storage_url must be configured")
-    return f"{settings.awsl_storage_url.rstrip('/')}/file/{file_id}"
+def _pick_files(files: List[TelegramFile]) -> Tuple[Optional[TelegramFile], Optional[TelegramFile]]:
+    """Find the largest file and the first file over 800 pixels, stopping each scan early.
 
-
-def get_largest_file(files: List[TelegramFile]) -> Optional[TelegramFile]:
-    """Get the largest file from a list of photo sizes."""
+    Telegram Bot API returns photo sizes sorted ascending by resolution, so the largest
+    is the last file with known dimensions. Either falls back to the last file.
+    """
     if not files:
-        return None
-    files_with_size: List[TelegramFile] = [f for f in files if f.width and f.height]
-    if files_with_size:
-        return max(files_with_size, key=lambda f: f.width * f.height)
-    return files[-1]
+        return None, None
+    largest: TelegramFile = next((f for f in reversed(files) if f.width and f.height), files[-1])
+    over_800: TelegramFile = next(
+        (f for f in files if (f.width and f.width > 800) or (f.height and f.height > 800)), files[-1]
+    )
+    return largest, over_800
 
 
-def get_first_file_over_800(files: List[TelegramFile]) -> Optional[TelegramFile]:
-    """Get the first file that exceeds 800 pixels in width or height."""
-    if not files:
-        return None
-    for f in files:
-        if f.width and f.width > 800:
-            return f
-        if f.height and f.height > 800:
-            return f
-    return files[-1]
-
-
-def _files_to_blobs(files: List[TelegramFile]) -> Blobs:
-    """Convert TelegramFile list to Blobs with original and large."""
-    original_file: Optional[TelegramFile] = get_largest_file(files)
-    large_file: Optional[TelegramFile] = get_first_file_over_800(files)
-
-    blobs_dict: dict[str, Blob] = {}
-    if original_file:
-        blobs_dict["original"] = Blob(
-            url=build_telegram_url(original_file.file_id),
-            file_id=original_file.file_id,
-            width=original_file.width,
-            height=original_file.height,
-        )
-    if large_file:
-        blobs_dict["large"] = Blob(
-            url=build_telegram_url(large_file.file_id),
-            file_id=large_file.file_id,
-            width=large_file.width,
-            height=large_file.height,
-        )
-    return Blobs(blobs=blobs_dict)
+def _source_blob(blob_group: BlobGroup) -> Blob:
+    """Get the single source Blob of a BlobGroup built by get_all_pic_to_upload."""
+    return next(iter(blob_group.blobs.blobs.values()))
 
 
-class UploadResult(BaseModel):
+def _chunk(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Yield consecutive lists of up to size items without slicing a full list."""
+    it: Iterator[str] = iter(items)
+    return iter(lambda: list(itertools.islice(it, size)), [])
+
+
+@dataclass(slots=True)
+class UploadResult:
     """Result of upload operation with success and failed blob groups."""
     succeeded: List[BlobGroup]
     failed: List[BlobGroup]
 
 
-class BatchUploadResult(BaseModel):
+@dataclass(slots=True)
+class BatchUploadResult:
     """Result of batch upload with files and error type."""
     files: Optional[List[List[TelegramFile]]]
     is_webpage_media_empty: bool = False
 
 
-def upload_media_group(group: UploadGroup) -> UploadResult:
+async def _upload_single(
+    url: str,
+    blob_group: BlobGroup,
+    caption: Optional[str],
+    i: int,
+    total: int,
+    semaphore: asyncio.Semaphore,
+) -> Optional[List[TelegramFile]]:
+    """Upload one image as photo, falling back to document with original dimensions."""
+    async with semaphore:
+        single_result: BatchUploadResult = await _upload_batch([url], caption)
+        if single_result.files and len(single_result.files) > 0:
+            _logger.info("Successfully uploaded image %d/%d as photo", i + 1, total)
+            return single_result.files[0]
+
+        # Fallback: try uploading as document with original dimensions
+        original_blob: Blob = _source_blob(blob_group)
+        _logger.info("Photo upload failed for image %d/%d, trying as document: %s", i + 1, total, url)
+        document_files: Optional[List[TelegramFile]] = await _upload_as_document(
+            url, width=original_blob.width, height=original_blob.height
+        )
+        if document_files:
+            _logger.info("Successfully uploaded image %d/%d as document", i + 1, total)
+            return document_files
+        _logger.warning("Failed to upload image %d/%d (both photo and document): %s", i + 1, total, url)
+        return None
+
+
+async def upload_media_group(group: UploadGroup) -> UploadResult:
     """
     Upload photos to Telegram via awsl-telegram-storage service.
-    Automatically splits into batches of 6 if more than 6 URLs.
-    On WEBPAGE_MEDIA_EMPTY error, retries each image individually.
+    Automatically splits into batches of 6 if more than 6 URLs, uploaded concurrently.
+    On WEBPAGE_MEDIA_EMPTY error, retries each image individually (a few at a time).
 
     Args:
         group: UploadGroup containing blob_groups and caption
@@ -132,13 +222,32 @@ def upload_media_group(group: UploadGroup) -> UploadResult:
     if not group.blob_groups:
         raise ValueError("At least 1 BlobGroup required")
 
-    urls: List[str] = [list(bg.blobs.blobs.values())[0].url for bg in group.blob_groups]
+    # Upload each distinct source URL once; reposts often repeat an image within a group
+    url_to_indices: dict[str, List[int]] = {}
+    for idx, bg in enumerate(group.blob_groups):
+        url_to_indices.setdefault(_source_blob(bg).url, []).append(idx)
+    if len(url_to_indices) != len(group.blob_groups):
+        _logger.info("Deduplicated %d pics into %d unique URLs", len(group.blob_groups), len(url_to_indices))
+    # URLs uploaded by a previous run are served from the persistent cache
+    cached_files: dict[str, List[dict]] = (
+        await asyncio.to_thread(_url_cache.get_many, list(url_to_indices)) if _url_cache else {}
+    )
+    pending_urls: List[str] = [url for url in url_to_indices if url not in cached_files]
+    if cached_files:
+        _logger.info("Reusing cached uploads for %d URLs", len(cached_files))
+    # First blob_group requesting each pending URL, aligned with the upload order
+    unique_groups: List[BlobGroup] = [group.blob_groups[url_to_indices[url][0]] for url in pending_urls]
+
     all_files: List[Optional[List[TelegramFile]]] = []
-    batches: List[List[str]] = [urls[i:i + BATCH_SIZE] for i in range(0, len(urls), BATCH_SIZE)]
+    # Batches are materialized since they are all uploaded concurrently
+    batches: List[List[str]] = list(_chunk(pending_urls, BATCH_SIZE))
+
+    batch_results: List[BatchUploadResult] = await asyncio.gather(
+        *(_upload_batch(batch_urls, group.caption) for batch_urls in batches)
+    )
 
-    global_idx: int = 0  # Track position in group.blob_groups
-    for batch_urls in batches:
-        batch_result: BatchUploadResult = _upload_batch(batch_urls, group.caption)
+    global_idx: int = 0  # Track position in unique_groups
+    for batch_urls, batch_result in zip(batches, batch_results):
 
         if batch_result.files is not None:
             # Batch upload succeeded
@@ -147,42 +256,65 @@ def upload_media_group(group: UploadGroup) -> UploadResult:
         elif batch_result.is_webpage_media_empty:
             # WEBPAGE_MEDIA_EMPTY detected, retry each image individually
             _logger.info("WEBPAGE_MEDIA_EMPTY detected, retrying batch of %d images individually", len(batch_urls))
-            for i, url in enumerate(batch_urls):
-                single_result: BatchUploadResult = _upload_batch([url], group.caption)
-                if single_result.files and len(single_result.files) > 0:
-                    all_files.append(single_result.files[0])
-                    _logger.info("Successfully uploaded image %d/%d as photo", i + 1, len(batch_urls))
-                else:
-                    # Fallback: try uploading as document with original dimensions
-                    original_blob: Blob = list(group.blob_groups[global_idx].blobs.blobs.values())[0]
-                    _logger.info("Photo upload failed for image %d/%d, trying as document: %s", i + 1, len(batch_urls), url)
-                    document_files: Optional[List[TelegramFile]] = _upload_as_document(
-                        url, width=original_blob.width, height=original_blob.height
-                    )
-                    if document_files:
-                        all_files.append(document_files)
-                        _logger.info("Successfully uploaded image %d/%d as document", i + 1, len(batch_urls))
-                    else:
-                        all_files.append(None)
-                        _logger.warning("Failed to upload image %d/%d (both photo and document): %s", i + 1, len(batch_urls), url)
-                global_idx += 1
-                if i < len(batch_urls) - 1:  # Don't delay after last image
-                    time.sleep(INDIVIDUAL_RETRY_DELAY)
+            semaphore: asyncio.Semaphore = asyncio.Semaphore(INDIVIDUAL_RETRY_CONCURRENCY)
+            single_files: List[Optional[List[TelegramFile]]] = await asyncio.gather(*(
+                _upload_single(url, unique_groups[global_idx + i], group.caption, i, len(batch_urls), semaphore)
+                for i, url in enumerate(batch_urls)
+            ))
+            all_files.extend(single_files)
+            global_idx += len(batch_urls)
         else:
             # Other error, mark all as failed
             _logger.error("Batch upload failed with non-WEBPAGE_MEDIA_EMPTY error, marking all as failed")
             all_files.extend([None] * len(batch_urls))
             global_idx += len(batch_urls)
 
+    if _url_cache:
+        await asyncio.to_thread(_url_cache.put_many, {
+            url: [f.model_dump() for f in files] for url, files in zip(pending_urls, all_files) if files
+        })
+
+    if len(pending_urls) != len(group.blob_groups):
+        # Fan the files of each unique URL back out to every blob_group that shared it
+        files_by_url: dict[str, Optional[List[TelegramFile]]] = dict(zip(pending_urls, all_files))
+        for url, file_dicts in cached_files.items():
+            files_by_url[url] = [TelegramFile.model_construct(**f) for f in file_dicts]
+        group_files: List[Optional[List[TelegramFile]]] = [None] * len(group.blob_groups)
+        for url, indices in url_to_indices.items():
+            for idx in indices:
+                # A URL without files counts as a failed pic instead of failing the group
+                group_files[idx] = files_by_url.get(url)
+        all_files = group_files
+
     succeeded: List[BlobGroup] = []
     failed: List[BlobGroup] = []
 
+    # Build original/large Blobs for every uploaded pic in one pass; locals avoid
+    # repeated global/attribute lookups, nothing here needs re-validation
+    blob_construct = Blob.model_construct
+    blobs_construct = Blobs.model_construct
+    blob_group_construct = BlobGroup.model_construct
+    append_succeeded = succeeded.append
     for blob_group, files in zip(group.blob_groups, all_files):
         if files:
-            succeeded.append(BlobGroup(
+            original_file, large_file = _pick_files(files)
+            append_succeeded(blob_group_construct(
                 id=blob_group.id,
                 awsl_id=blob_group.awsl_id,
-                blobs=_files_to_blobs(files),
+                blobs=blobs_construct(blobs={
+                    "original": blob_construct(
+                        url=_FILE_URL_PREFIX + original_file.file_id,
+                        file_id=original_file.file_id,
+                        width=original_file.width,
+                        height=original_file.height,
+                    ),
+                    "large": blob_construct(
+                        url=_FILE_URL_PREFIX + large_file.file_id,
+                        file_id=large_file.file_id,
+                        width=large_file.width,
+                        height=large_file.height,
+                    ),
+                }),
             ))
         else:
             failed.append(blob_group)
@@ -192,11 +324,11 @@ def upload_media_group(group: UploadGroup) -> UploadResult:
     return UploadResult(succeeded=succeeded, failed=failed)
 
 
-def _download_image(url: str) -> Optional[bytes]:
+async def _download_image(url: str) -> Optional[bytes]:
     """Download image from URL to memory."""
     try:
         _logger.info("Downloading image: %s", url)
-        response: httpx.Response = _client.get(url, timeout=30)
+        response: httpx.Response = await _client.get(url, timeout=30)
         response.raise_for_status()
         _logger.info("Downloaded %d bytes", len(response.content))
         return response.content
@@ -205,71 +337,40 @@ def _download_image(url: str) -> Optional[bytes]:
         return None
 
 
-def _upload_as_document(url: str, width: Optional[int] = None, height: Optional[int] = None) -> Optional[List[TelegramFile]]:
-    """Upload single image as document (fallback when photo upload fails). Only retry on 429.
+async def _post_document(request_kwargs: dict) -> Optional[List[TelegramFile]]:
+    """POST a document upload to the storage service. Only retry on 429.
 
-    Args:
-        url: Image URL to upload
-        width: Original image width (will be preserved in returned TelegramFile)
-        height: Original image height (will be preserved in returned TelegramFile)
+    Returns the uploaded files, or None on any failure (including exhausted rate limit retries).
     """
-    api_url: str = f"{settings.awsl_storage_url.rstrip('/')}/api/upload"
-
-    # Try to download image locally first
-    image_data: Optional[bytes] = _download_image(url)
-    if not image_data:
-        _logger.warning("Cannot download image, skipping document upload")
-        return None
-
-    # Prepare multipart form data with binary file
-    files: dict = {
-        "file": ("image.jpg", image_data, "image/jpeg"),
-        "media_type": (None, "document"),
-    }
-    if settings.awsl_storage_chat_id:
-        files["chat_id"] = (None, settings.awsl_storage_chat_id)
-
-    headers: dict[str, str] = {
-        "X-Api-Token": settings.awsl_storage_api_token,
-    }
-
     for attempt in range(MAX_RETRIES):
         try:
-            response: httpx.Response = _client.post(api_url, files=files, headers=headers)
-            data: dict = response.json()
+            await _wait_for_rate_limit()
+            response: httpx.Response = await _client.post(_UPLOAD_URL, **request_kwargs)
+            # Decode and validate the body in a single pydantic-core pass
+            data: _UploadResponse = _UploadResponse.model_validate_json(response.content)
 
-            if not data.get("success"):
-                error: str = data.get("error", "Unknown error")
+            if not data.success:
+                error: str = data.error or "Unknown error"
                 # Only retry on rate limit (429)
                 if "Too Many Requests" in error or "retry after" in error.lower():
                     retry_after: Optional[float] = _parse_retry_after(error)
-                    delay: float = retry_after if retry_after else (RETRY_DELAY * (attempt + 1))
-                    _logger.warning("Document upload rate limited (attempt %d/%d), sleeping for %.1fs: %s",
+                    delay: float = retry_after if retry_after else _backoff_delay(attempt)
+                    _logger.warning("Document upload rate limited (attempt %d/%d), pausing uploads for %.1fs: %s",
                                    attempt + 1, MAX_RETRIES, delay, error)
-                    time.sleep(delay)
+                    _pause_uploads(delay)
                     continue
                 else:
                     # Other errors, don't retry
-                    _logger.warning("Document upload failed (non-retriable): %s", error)
+                    _logger.warning("Document upload failed (HTTP %d, non-retriable): %s",
+                                   response.status_code, error)
                     return None
 
-            telegram_files: List[TelegramFile] = [
-                TelegramFile(
-                    file_id=f["file_id"],
-                    # Use original dimensions instead of Telegram's (documents don't have size info)
-                    width=width,
-                    height=height,
-                )
-                for f in data.get("files", [])
-            ]
-
-            _logger.info("Successfully uploaded as document with original dimensions: %sx%s", width, height)
-            return telegram_files
+            return data.files
 
         except httpx.HTTPError as e:
             _logger.warning("Document upload request failed: %s", e)
             return None
-        except json.JSONDecodeError as e:
+        except ValidationError as e:
             _logger.warning("Document upload JSON parse failed: %s", e)
             return None
 
@@ -277,53 +378,96 @@ def _upload_as_document(url: str, width: Optional[int] = None, height: Optional[
     return None
 
 
-def _upload_batch(urls: List[str], caption: Optional[str] = None) -> BatchUploadResult:
-    """Upload a single batch of URLs (max 6) with retry."""
-    api_url: str = f"{settings.awsl_storage_url.rstrip('/')}/api/upload/group"
+async def _upload_as_document(url: str, width: Optional[int] = None, height: Optional[int] = None) -> Optional[List[TelegramFile]]:
+    """Upload single image as document (fallback when photo upload fails).
+
+    Telegram has already failed to fetch the URL at this point, so the image is
+    downloaded locally and uploaded as multipart.
 
+    Args:
+        url: Image URL to upload
+        width: Original image width (will be preserved in returned TelegramFile)
+        height: Original image height (will be preserved in returned TelegramFile)
+    """
+    image_data: Optional[bytes] = await _download_image(url)
+    if not image_data:
+        _logger.warning("Cannot download image, skipping document upload")
+        return None
+
+    # Prepare multipart form data with binary file
+    files: dict = {
+        "file": ("image.jpg", image_data, "image/jpeg"),
+        "media_type": (None, "document"),
+    }
+    if settings.awsl_storage_chat_id:
+        files["chat_id"] = (None, settings.awsl_storage_chat_id)
+    uploaded: Optional[List[TelegramFile]] = await _post_document({"files": files, "headers": _AUTH_HEADERS})
+    if not uploaded:
+        return None
+
+    telegram_files: List[TelegramFile] = [
+        TelegramFile.model_construct(
+            file_id=f.file_id,
+            # Use original dimensions instead of Telegram's (documents don't have size info)
+            width=width,
+            height=height,
+        )
+        for f in uploaded
+    ]
+
+    _logger.info("Successfully uploaded as document with original dimensions: %sx%s", width, height)
+    return telegram_files
+
+
+async def _upload_batch(urls: List[str], caption: Optional[str] = None) -> BatchUploadResult:
+    """Upload a single batch of URLs (max 6) with retry."""
     payload: dict = {"urls": urls}
     if caption:
         payload["caption"] = caption
     if settings.awsl_storage_chat_id:
         payload["chat_id"] = settings.awsl_storage_chat_id
 
-    headers: dict[str, str] = {
-        "X-Api-Token": settings.awsl_storage_api_token,
-        "Content-Type": "application/json",
-    }
-
+    # Encode once, every retry attempt reuses the same body
+    body: bytes = orjson.dumps(payload)
     last_error: Optional[str] = None
     is_webpage_media_empty: bool = False
 
     for attempt in range(MAX_RETRIES):
         try:
-            response: httpx.Response = _client.post(api_url, json=payload, headers=headers)
-            data: dict = response.json()
-
-            if not data.get("success"):
-                last_error = data.get("error", "Unknown error")
-                if "WEBPAGE_MEDIA_EMPTY" in last_error:
-                    _logger.warning("WEBPAGE_MEDIA_EMPTY detected: %s", last_error)
-                    is_webpage_media_empty = True
-                    return BatchUploadResult(files=None, is_webpage_media_empty=True)
-
+            await _wait_for_rate_limit()
+            response: httpx.Response = await _client.post(_UPLOAD_GROUP_URL, content=body, headers=_JSON_HEADERS)
+            # Short-circuit before decoding the body at all on WEBPAGE_MEDIA_EMPTY
+            if _WEBPAGE_MEDIA_EMPTY in response.content:
+                _logger.warning("WEBPAGE_MEDIA_EMPTY detected: %s", response.text)
+                is_webpage_media_empty = True
+                return BatchUploadResult(files=None, is_webpage_media_empty=True)
+
+            # Decode and validate the body in a single pydantic-core pass
+            data: _GroupUploadResponse = _GroupUploadResponse.model_validate_json(response.content)
+
+            if not data.success:
+                last_error = data.error or "Unknown error"
                 # Check if it's a rate limit error and parse retry time
                 if "Too Many Requests" in last_error or "retry after" in last_error.lower():
                     retry_after: Optional[float] = _parse_retry_after(last_error)
-                    delay: float = retry_after if retry_after else (RETRY_DELAY * (attempt + 1))
-                    _logger.warning("Upload rate limited (attempt %d/%d), sleeping for %.1fs: %s",
+                    delay: float = retry_after if retry_after else _backoff_delay(attempt)
+                    _logger.warning("Upload rate limited (attempt %d/%d), pausing uploads for %.1fs: %s",
                                    attempt + 1, MAX_RETRIES, delay, last_error)
-                    time.sleep(delay)
+                    _pause_uploads(delay)
                 else:
                     _logger.warning("Upload failed (attempt %d/%d): %s", attempt + 1, MAX_RETRIES, last_error)
-                    time.sleep(RETRY_DELAY * (attempt + 1))
+                    await asyncio.sleep(_backoff_delay(attempt))
+                continue
+
+            # One file list per URL keeps results aligned with the URLs sent; retry otherwise
+            if len(data.files) != len(urls):
+                last_error = f"Expected {len(urls)} file lists, got {len(data.files)}"
+                _logger.warning("Upload response mismatch (attempt %d/%d): %s", attempt + 1, MAX_RETRIES, last_error)
+                await asyncio.sleep(_backoff_delay(attempt))
                 continue
 
-            files: List[List[TelegramFile]] = [
-                [TelegramFile(file_id=f["file_id"], width=f.get("width"), height=f.get("height"))
-                 for f in group]
-                for group in data.get("files", [])
-            ]
+            # Already validated TelegramFile objects, nothing to rebuild
+            files: List[List[TelegramFile]] = data.files
 
             _logger.info("Uploaded %d images to Telegram", len(files))
             return BatchUploadResult(files=files, is_webpage_media_empty=False)
@@ -331,11 +475,11 @@ def _upload_batch(urls: List[str], caption: Optional[str] = None) -> BatchUpload
         except httpx.HTTPError as e:
             last_error = str(e)
             _logger.warning("Request failed (attempt %d/%d): %s", attempt + 1, MAX_RETRIES, last_error)
-            time.sleep(RETRY_DELAY * (attempt + 1))
-        except json.JSONDecodeError as e:
+            await asyncio.sleep(_backoff_delay(attempt))
+        except ValidationError as e:
             last_error = f"Invalid JSON response: {e}"
             _logger.warning("JSON parse failed (attempt %d/%d): %s", attempt + 1, MAX_RETRIES, last_error)
-            time.sleep(RETRY_DELAY * (attempt + 1))
+            await asyncio.sleep(_backoff_delay(attempt))
 
     _logger.error("Upload failed after %d attempts: %s", MAX_RETRIES, last_error)
     return BatchUploadResult(files=None, is_webpage_media_empty=is_webpage_media_empty)
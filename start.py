@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from awsl_pic_pipeline.migration import migration
@@ -8,4 +9,4 @@ logging.basicConfig(
 )
 
 
-migration()
+asyncio.run(migration())